@@ -3,6 +3,10 @@
 Create approved hash signature format for Safe transactions
 """
 
+# Approved hash signature template (65 bytes): zero padding + 0x01 signature type
+_APPROVED_TEMPLATE = bytearray(65)
+_APPROVED_TEMPLATE[64] = 0x01
+
 def create_approved_hash_signature(owner_address):
     """
     Create the signature format for an owner who called approveHash()
@@ -15,37 +19,43 @@ def create_approved_hash_signature(owner_address):
     This tells Safe: "This owner pre-approved the hash, don't check signature"
     """
     # Remove 0x prefix and make lowercase
-    clean_address = owner_address.replace('0x', '').lower()
-    
-    # Create the approved hash signature (65 bytes = 130 hex chars):
-    # - 12 zero bytes + 20 bytes address = 32 bytes (64 hex chars)
-    # - 32 zero bytes = 32 bytes (64 hex chars) 
-    # - 0x01 = 1 byte (2 hex chars)
-    
-    signature = (
-        "000000000000000000000000" +  # 12 bytes of leading zeros
-        clean_address +                 # 20 bytes address (40 chars)
-        "0000000000000000000000000000000000000000000000000000000000000000" +  # 32 zero bytes (64 chars)
-        "01"  # signature type: pre-validated
-    )
+    clean_address = owner_address.removeprefix('0x').removeprefix('0X').lower()
+    return _create_approved_hash_signature_normalized(clean_address)
+
+def _owner_address_bytes(clean_address):
+    """Decode an address already stripped of 0x and lowercased to its 20 bytes"""
+    try:
+        address_bytes = bytes.fromhex(clean_address)
+    except ValueError:
+        address_bytes = b''  # not hex, reported below
+    if len(address_bytes) != 20:
+        raise ValueError(f"Invalid owner address: 0x{clean_address}")
+    return address_bytes
+
+def _create_approved_hash_signature_normalized(clean_address):
+    """Build the signature for an address already stripped of 0x and lowercased"""
+    # Copy the 65-byte template and paste the address into bytes 12-31
+    signature = bytearray(_APPROVED_TEMPLATE)
+    signature[12:32] = _owner_address_bytes(clean_address)
     
-    return signature
+    return signature.hex()
 
 def create_multiple_approved_signatures(addresses):
     """Create and sort multiple approved hash signatures"""
-    signatures = []
+    # Normalize once, then sort addresses in ascending order (Safe requirement)
+    sorted_addresses = sorted([addr.removeprefix('0x').removeprefix('0X').lower() for addr in addresses])
     
-    # Sort addresses in ascending order (Safe requirement)
-    sorted_addresses = sorted([addr.lower() for addr in addresses])
+    # One 65-byte template per owner, filled in place and hex-encoded once
+    signatures = _APPROVED_TEMPLATE * len(sorted_addresses)
     
     print("Creating approved hash signatures for:")
-    for addr in sorted_addresses:
-        print(f"  {addr}")
-        sig = create_approved_hash_signature(addr)
-        signatures.append(sig)
+    for i, addr in enumerate(sorted_addresses):
+        print(f"  0x{addr}")
+        offset = 65 * i
+        signatures[offset + 12:offset + 32] = _owner_address_bytes(addr)
     
     # Combine all signatures
-    combined = "0x" + "".join(signatures)
+    combined = "0x" + signatures.hex()
     return combined
 
 def get_signature(owner_address):
@@ -69,14 +79,18 @@ def main():
         print("No addresses entered.")
         return
     
-    if len(addresses) == 1:
-        result = get_signature(addresses[0])
-        print(f"\n✅ Approved hash signature:")
-        print(result)
-    else:
-        result = create_multiple_approved_signatures(addresses)
-        print(f"\n✅ Combined approved hash signatures ({len(addresses)} owners):")
-        print(result)
+    try:
+        if len(addresses) == 1:
+            result = get_signature(addresses[0])
+            print(f"\n✅ Approved hash signature:")
+            print(result)
+        else:
+            result = create_multiple_approved_signatures(addresses)
+            print(f"\n✅ Combined approved hash signatures ({len(addresses)} owners):")
+            print(result)
+    except ValueError as e:
+        print(f"\n❌ {e}")
+        return
     
     print(f"\nLength: {len(result)} characters ({(len(result)-2)//2} bytes)")
     expected_bytes = len(addresses) * 65
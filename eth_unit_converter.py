@@ -1,17 +1,37 @@
+from decimal import Decimal, InvalidOperation, localcontext
+
+# Unit scaling factors
+_WEI_PER_ETH = 10**18
+_GWEI_PER_ETH = 10**9
+_WEI_PER_GWEI = 10**9
+
+# Decimal precision for scaling: enough digits for any uint256 result (78 digits)
+_PRECISION = 78
+
+def _to_decimal(amount):
+    """Parse an amount (commas allowed) as an exact Decimal"""
+    try:
+        return Decimal(str(amount).replace(',', ''))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount}")
+
+def _scale(amount, factor):
+    """Multiply an amount by a unit factor without rounding (the default context keeps only 28 digits)"""
+    with localcontext() as ctx:
+        ctx.prec = _PRECISION
+        return int(_to_decimal(amount) * factor)
+
 def eth_to_wei(eth_amount):
     """Convert ETH to wei (multiply by 10^18)"""
-    eth_amount = str(eth_amount).replace(',', '')
-    return int(float(eth_amount) * (10**18))
+    return _scale(eth_amount, _WEI_PER_ETH)
 
 def eth_to_gwei(eth_amount):
     """Convert ETH to gwei (multiply by 10^9)"""
-    eth_amount = str(eth_amount).replace(',', '')
-    return int(float(eth_amount) * (10**9))
+    return _scale(eth_amount, _GWEI_PER_ETH)
 
 def gwei_to_wei(gwei_amount):
     """Convert gwei to wei (multiply by 10^9)"""
-    gwei_amount = str(gwei_amount).replace(',', '')
-    return int(float(gwei_amount) * (10**9))
+    return _scale(gwei_amount, _WEI_PER_GWEI)
 
 def main():
     """Main function to handle user input and conversions"""
@@ -4,10 +4,21 @@ Safe MultiSend Transaction Generator
 Combines USDC and ZORA transfers into a single Safe transaction using MultiSend
 """
 
+from safe_common import SAFE_TX_TYPEHASH, checksum, encode_domain, encode_safe_tx
 from web3 import Web3
-from eth_utils import keccak
+from web3.exceptions import Web3Exception
+from eth_abi.exceptions import DecodingError
+from eth_abi import decode as abi_decode
+from eth_hash.auto import keccak
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import functools
 import json
+import os
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # MultiSend contract addresses by network
 MULTISEND_ADDRESSES = {
@@ -18,15 +29,180 @@ MULTISEND_ADDRESSES = {
     137: "0x998739BFdAAdde7C933B942a68053933098f9EDa"     # Polygon
 }
 
+# Multicall3 is deployed at the same address on all supported networks
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+# Multicall3 ABI for aggregate3
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"}
+                ],
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"}
+                ],
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+# On-disk cache of immutable ERC20 metadata (name, symbol, decimals)
+TOKEN_META_CACHE_PATH = Path("~/.safe_utils/token_meta.json").expanduser()
+
+# Serializes metadata cache saves between builders in this process (one per chain in
+# get_all_tokens_multichain), so each save merges rather than overwrites the others
+_META_CACHE_LOCK = threading.Lock()
+
+# Maximum eth_call requests per JSON-RPC batch POST (some providers, e.g. Polygon RPCs, cap at 100)
+_RPC_BATCH_SIZE = 100
+
+# Concurrent per-token RPC lookups when batching is unavailable (matches the HTTP pool size)
+_MAX_RPC_WORKERS = 10
+
+# Concurrent per-chain Alchemy scans (stays under Alchemy's compute-unit/s limits)
+_MAX_CHAIN_WORKERS = 8
+
+# Alchemy network names by chain ID
+ALCHEMY_CHAIN_NAMES = {
+    1: "eth-mainnet",
+    10: "opt-mainnet",
+    8453: "base-mainnet",
+    42161: "arb-mainnet",
+    137: "polygon-mainnet"
+}
+
+# Failures expected from a single token's RPC calls (reverts, bad return data, transport errors);
+# web3 reports JSON-RPC error responses as ValueError
+_TOKEN_CALL_ERRORS = (Web3Exception, DecodingError, requests.exceptions.RequestException, ValueError)
+
+# HTTP (connect, read) timeouts in seconds for RPC / Alchemy requests
+_HTTP_TIMEOUT = (3, 15)
+
+def _create_http_session():
+    """
+    HTTP session with pooled keep-alive connections and retry with backoff on
+    rate limiting / gateway errors (JSON-RPC reads are safe to retry, so POST is included)
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.25,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods=["POST"]
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=_MAX_RPC_WORKERS, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# ERC20 transfer(address,uint256) function selector
+_TRANSFER_SELECTOR = bytes.fromhex("a9059cbb")
+
+# ERC20 view function selectors: balanceOf(address), name(), symbol(), decimals()
+_BALANCE_OF_SELECTOR = bytes.fromhex("70a08231")
+_NAME_SELECTOR = bytes.fromhex("06fdde03")
+_SYMBOL_SELECTOR = bytes.fromhex("95d89b41")
+_DECIMALS_SELECTOR = bytes.fromhex("313ce567")
+
+# MultiSend function selector: multiSend(bytes)
+_MULTISEND_SELECTOR = bytes.fromhex("8d80ff0a")
+
+def _encode_transfer(recipient_bytes, amount):
+    """ERC20 transfer(address,uint256) calldata for a 20-byte recipient"""
+    return _TRANSFER_SELECTOR + bytes(12) + recipient_bytes + amount.to_bytes(32, 'big')
+
+@functools.lru_cache(maxsize=128)
+def _compute_domain_separator(chain_id, safe_address):
+    """EIP-712 domain separator for a Safe, constant per (chain_id, safe_address)"""
+    return keccak(encode_domain(chain_id, safe_address))
+
+@functools.lru_cache(maxsize=256)
+def _keccak_hex(data_hex):
+    """keccak of hex-encoded calldata, memoized for calldata reused across nonces"""
+    return keccak(bytes.fromhex(data_hex.removeprefix('0x').removeprefix('0X')))
+
+@functools.lru_cache(maxsize=1024)
+def _safe_tx_hash(domain_separator, to, value, data_hash, operation, safe_tx_gas, base_gas, gas_price, gas_token, refund_receiver, nonce):
+    """EIP-712 hash of a SafeTx struct (pure function of its fields, so memoized)"""
+    encoded_tx = encode_safe_tx(
+        SAFE_TX_TYPEHASH,
+        to,
+        value,
+        data_hash,
+        operation,
+        safe_tx_gas,
+        base_gas,
+        gas_price,
+        gas_token,
+        refund_receiver,
+        nonce
+    )
+    return keccak(b'\x19\x01' + domain_separator + keccak(encoded_tx))
+
+def _alchemy_url(chain_id, api_key):
+    """Alchemy RPC endpoint for a chain (defaults to Ethereum mainnet)"""
+    chain = ALCHEMY_CHAIN_NAMES.get(chain_id, "eth-mainnet")
+    return f"https://{chain}.g.alchemy.com/v2/{api_key}"
+
+def _hex_result(result):
+    """Decode a 0x-prefixed JSON-RPC eth_call result to bytes (None if missing or malformed)"""
+    if not isinstance(result, str) or not result.startswith('0x'):
+        return None
+    try:
+        return bytes.fromhex(result[2:])
+    except ValueError:
+        return None
+
 class MultiSendSafeTransaction:
     def __init__(self, safe_address, chain_id=1, rpc_url=None):
+        # Validate inputs up front so the RPC methods only need to handle call failures
+        if chain_id not in MULTISEND_ADDRESSES:
+            raise ValueError(f"Unsupported chain ID: {chain_id} (supported: {', '.join(map(str, MULTISEND_ADDRESSES))})")
+        if not Web3.is_address(safe_address):
+            raise ValueError(f"Invalid Safe address: {safe_address}")
+        
+        self.rpc_url = rpc_url
+        self.http = _create_http_session()
+        # Offline use (hashing/encoding only) needs no Web3 instance
         if rpc_url:
-            self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+            # web3 caches the provider session per (thread, endpoint), so self.http only backs Web3
+            # calls made from this thread; worker threads post eth_calls through self.http directly
+            # (_eth_call), and get_all_tokens_multichain builds each builder in its own worker
+            self.w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={"timeout": _HTTP_TIMEOUT}, session=self.http))
+            # Check connectivity once; per-call failures are still caught where the calls are made
+            if not self.w3.is_connected():
+                print(f"❌ Web3 not connected to RPC endpoint {rpc_url}")
         else:
-            self.w3 = Web3()
-        self.safe_address = Web3.to_checksum_address(safe_address)
+            self.w3 = None
+        self.safe_address = checksum(safe_address)
         self.chain_id = chain_id
-        self.multisend_address = MULTISEND_ADDRESSES.get(chain_id, MULTISEND_ADDRESSES[1])
+        self.multisend_address = MULTISEND_ADDRESSES[chain_id]
+        self._domain_separator = _compute_domain_separator(self.chain_id, self.safe_address)
+        self._contract_cache = {}
+        self._multicall = None
+        self._meta_cache_path = TOKEN_META_CACHE_PATH
+        self._meta_cache = None  # loaded on first use
+        self._meta_cache_dirty = False
+        self._print_lock = threading.Lock()  # keeps worker-thread error lines intact
+        
+        # balanceOf(safe_address) calldata, identical for every token
+        self._balance_of_data = _BALANCE_OF_SELECTOR + bytes(12) + bytes.fromhex(self.safe_address[2:])
         
         # ERC20 ABI for balanceOf, name, symbol, decimals functions
         self.erc20_abi = [
@@ -60,195 +236,415 @@ class MultiSendSafeTransaction:
             }
         ]
     
+    def _token_contract(self, token_address):
+        """Get a (cached) ERC20 contract object for a token address"""
+        token_contract = self._contract_cache.get(token_address)
+        if token_contract is None:
+            token_contract = self.w3.eth.contract(
+                address=checksum(token_address),
+                abi=self.erc20_abi
+            )
+            self._contract_cache[token_address] = token_contract
+        return token_contract
+    
+    def _aggregate3(self, calls):
+        """
+        Execute (target, allowFailure, callData) calls in one Multicall3 aggregate3 eth_call
+        Returns a list of (success, returnData) tuples in call order
+        """
+        if self._multicall is None:
+            self._multicall = self.w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+        return self._multicall.functions.aggregate3(calls).call()
+    
     def get_token_balance(self, token_address):
         """Get ERC20 token balance for the Safe address"""
         try:
-            if not self.w3.is_connected():
+            if self.w3 is None:
                 print("❌ Web3 not connected to RPC endpoint")
                 return 0
                 
-            token_contract = self.w3.eth.contract(
-                address=Web3.to_checksum_address(token_address),
-                abi=self.erc20_abi
-            )
-            
+            token_contract = self._token_contract(token_address)
             balance = token_contract.functions.balanceOf(self.safe_address).call()
             return balance
-        except Exception as e:
+        except _TOKEN_CALL_ERRORS as e:
             print(f"❌ Error fetching balance for {token_address}: {e}")
             return 0
     
+    def get_token_balances(self, token_addresses):
+        """
+        Get ERC20 token balances for the Safe address in a single Multicall3 call (see _eth_calls)
+        Returns a dict of token_address -> balance (0 for tokens whose call failed)
+        """
+        if not token_addresses:
+            return {}
+        if self.w3 is None:
+            print("❌ Web3 not connected to RPC endpoint")
+            return {token_address: 0 for token_address in token_addresses}
+        
+        results = self._eth_calls([(checksum(token_address), self._balance_of_data) for token_address in token_addresses])
+        
+        balances = {}
+        for token_address, return_data in zip(token_addresses, results):
+            if return_data is not None and len(return_data) >= 32:
+                balances[token_address] = int.from_bytes(return_data[:32], 'big')
+            else:
+                print(f"❌ Error fetching balance for {token_address}: call failed")
+                balances[token_address] = 0
+        
+        return balances
+    
+    def _load_meta_cache(self):
+        """Load the token metadata cache from disk (empty if missing or unreadable)"""
+        if self._meta_cache is None:
+            try:
+                self._meta_cache = json.loads(self._meta_cache_path.read_text())
+            except (OSError, ValueError):
+                self._meta_cache = {}
+        return self._meta_cache
+    
+    def _save_meta_cache(self):
+        """
+        Write the token metadata cache back to disk if it changed, merged with entries other
+        builders (e.g. concurrent chain scans) saved meanwhile, replacing the file atomically
+        """
+        if not self._meta_cache_dirty:
+            return
+        with _META_CACHE_LOCK:
+            try:
+                on_disk = json.loads(self._meta_cache_path.read_text())
+            except (OSError, ValueError):
+                on_disk = {}
+            if isinstance(on_disk, dict):
+                on_disk.update(self._meta_cache)
+                self._meta_cache = on_disk
+            try:
+                self._meta_cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self._meta_cache_path.with_name(f"{self._meta_cache_path.name}.{os.getpid()}.tmp")
+                tmp_path.write_text(json.dumps(self._meta_cache))
+                os.replace(tmp_path, self._meta_cache_path)
+                self._meta_cache_dirty = False
+            except OSError as e:
+                print(f"⚠️  Could not save token metadata cache: {e}")
+    
+    def _cached_metadata(self, token_address):
+        """Get cached (name, symbol, decimals) for a token, or None"""
+        meta = self._load_meta_cache().get(f"{self.chain_id}:{checksum(token_address)}")
+        if meta is None:
+            return None
+        return meta['name'], meta['symbol'], meta['decimals']
+    
+    def _store_metadata(self, token_address, name, symbol, decimals):
+        """Remember a token's metadata (persisted by _save_meta_cache)"""
+        self._load_meta_cache()[f"{self.chain_id}:{checksum(token_address)}"] = {
+            'name': name,
+            'symbol': symbol,
+            'decimals': decimals
+        }
+        self._meta_cache_dirty = True
+    
+    def _get_metadata_cached(self, token_address):
+        """Get token (name, symbol, decimals), reading the contract only on a cache miss"""
+        meta = self._cached_metadata(token_address)
+        if meta is None:
+            token_contract = self._token_contract(token_address)
+            meta = (
+                token_contract.functions.name().call(),
+                token_contract.functions.symbol().call(),
+                token_contract.functions.decimals().call()
+            )
+            self._store_metadata(token_address, *meta)
+        return meta
+    
+    def _get_balance(self, token_address):
+        """Get the Safe's balance of a token (errors propagate to the caller)"""
+        return self._token_contract(token_address).functions.balanceOf(self.safe_address).call()
+    
     def get_token_info(self, token_address):
         """Get token name, symbol, decimals, and balance"""
+        if self.w3 is None:
+            print("❌ Web3 not connected to RPC endpoint")
+            return None
+        
+        token_info = self._fetch_token_info(token_address)
+        self._save_meta_cache()
+        return token_info
+    
+    def _fetch_token_info(self, token_address):
+        """get_token_info without persisting the metadata cache (safe to run from worker threads)"""
         try:
-            token_contract = self.w3.eth.contract(
-                address=Web3.to_checksum_address(token_address),
-                abi=self.erc20_abi
-            )
-            
-            name = token_contract.functions.name().call()
-            symbol = token_contract.functions.symbol().call()
-            decimals = token_contract.functions.decimals().call()
-            balance = token_contract.functions.balanceOf(self.safe_address).call()
+            name, symbol, decimals = self._get_metadata_cached(token_address)
+            balance = self._get_balance(token_address)
             
-            return {
-                'address': Web3.to_checksum_address(token_address),
-                'name': name,
-                'symbol': symbol,
-                'decimals': decimals,
-                'balance': balance,
-                'balance_formatted': f"{balance / (10 ** decimals):.6f}"
-            }
-        except Exception as e:
-            print(f"❌ Error fetching token info for {token_address}: {e}")
+            return self._token_info_dict(token_address, name, symbol, decimals, balance)
+        except _TOKEN_CALL_ERRORS as e:
+            with self._print_lock:
+                print(f"❌ Error fetching token info for {token_address}: {e}")
+            return None
+    
+    def _token_info_dict(self, token_address, name, symbol, decimals, balance):
+        """Build the token info dict returned by get_token_info"""
+        return {
+            'address': checksum(token_address),
+            'name': name,
+            'symbol': symbol,
+            'decimals': decimals,
+            'balance': balance,
+            'balance_formatted': f"{balance / (10 ** decimals):.6f}"
+        }
+    
+    def _eth_calls(self, calls):
+        """
+        Run (target, callData) eth_calls in one Multicall3 aggregate3 call, falling back to
+        JSON-RPC batch POSTs where Multicall3 is unavailable, then to concurrent single
+        eth_calls where the endpoint rejects batches
+        Returns the return data of each call in order (None for calls that failed)
+        """
+        try:
+            results = self._aggregate3([(target, True, call_data) for target, call_data in calls])
+            return [return_data if success else None for success, return_data in results]
+        except _TOKEN_CALL_ERRORS as e:
+            print(f"❌ Multicall3 lookup failed: {e}")
+            print("💡 Falling back to JSON-RPC batch calls...")
+        
+        try:
+            results = self._rpc_batch(self.rpc_url, [
+                ("eth_call", [{"to": target, "data": "0x" + call_data.hex()}, "latest"])
+                for target, call_data in calls
+            ])
+            return [_hex_result(result) for result in results]
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"❌ JSON-RPC batch lookup failed: {e}")
+            print("💡 Falling back to per-token calls...")
+        
+        with ThreadPoolExecutor(max_workers=_MAX_RPC_WORKERS) as executor:
+            return list(executor.map(self._eth_call, calls))
+    
+    def _eth_call(self, call):
+        """
+        Single (target, callData) eth_call posted through the pooled HTTP session
+        (thread-safe, unlike Web3 calls, whose provider session is per-thread)
+        Returns the return data, or None if the call failed
+        """
+        target, call_data = call
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "eth_call",
+            "params": [{"to": target, "data": "0x" + call_data.hex()}, "latest"]
+        }
+        try:
+            response = self.http.post(self.rpc_url, json=payload, timeout=_HTTP_TIMEOUT).json()
+        except (requests.exceptions.RequestException, ValueError):
             return None
+        return _hex_result(response.get('result') if isinstance(response, dict) else None)
+    
+    def _rpc_batch(self, url, calls):
+        """
+        Send (method, params) requests as JSON-RPC batch POSTs of up to _RPC_BATCH_SIZE requests
+        Returns the results in call order (None for requests that returned an error)
+        """
+        results = []
+        for start in range(0, len(calls), _RPC_BATCH_SIZE):
+            chunk = calls[start:start + _RPC_BATCH_SIZE]
+            payload = [
+                {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+                for i, (method, params) in enumerate(chunk)
+            ]
+            response = self.http.post(url, json=payload, timeout=_HTTP_TIMEOUT).json()
+            if not isinstance(response, list):
+                raise ValueError(f"RPC endpoint rejected batch request: {response}")
+            
+            # Batch responses may come back in any order, so match them by id
+            responses_by_id = {item.get('id'): item for item in response if isinstance(item, dict)}
+            results.extend(responses_by_id.get(i, {}).get('result') for i in range(len(chunk)))
+        
+        return results
+    
+    def _fetch_token_metadatas(self, token_addresses):
+        """Read and cache (name, symbol, decimals) for many tokens in one batched lookup (see _eth_calls)"""
+        if not token_addresses:
+            return
+        
+        results = self._eth_calls([
+            (checksum(token_address), selector)
+            for token_address in token_addresses
+            for selector in (_NAME_SELECTOR, _SYMBOL_SELECTOR, _DECIMALS_SELECTOR)
+        ])
+        
+        for i, token_address in enumerate(token_addresses):
+            name_data, symbol_data, decimals_data = results[3 * i:3 * i + 3]
+            try:
+                if None in (name_data, symbol_data, decimals_data):
+                    raise ValueError("call failed")
+                (name,) = abi_decode(['string'], name_data)
+                (symbol,) = abi_decode(['string'], symbol_data)
+                (decimals,) = abi_decode(['uint8'], decimals_data)
+            except (DecodingError, ValueError) as e:
+                print(f"❌ Error fetching token info for {token_address}: {e}")
+                continue
+            self._store_metadata(token_address, name, symbol, decimals)
+        
+        self._save_meta_cache()
     
     def discover_tokens_from_list(self, token_list):
         """Check a list of known token addresses for balances"""
         tokens_with_balance = []
         
         print("🔍 Checking tokens for balances...")
-        for token_address in token_list:
-            token_info = self.get_token_info(token_address)
-            if token_info and token_info['balance'] > 0:
-                tokens_with_balance.append(token_info)
-                print(f"✅ {token_info['symbol']}: {token_info['balance_formatted']}")
+        
+        # Probe balances first so metadata is only fetched for tokens the Safe holds
+        balances = self.get_token_balances(token_list)
+        held_tokens = [token_address for token_address in token_list if balances.get(token_address, 0) > 0]
+        
+        # Balances are already known, so only read name/symbol/decimals for uncached tokens
+        uncached = [token_address for token_address in held_tokens if self._cached_metadata(token_address) is None]
+        self._fetch_token_metadatas(uncached)
+        
+        for token_address in held_tokens:
+            meta = self._cached_metadata(token_address)
+            if meta is None:
+                continue  # metadata lookup failed (already reported)
+            token_info = self._token_info_dict(token_address, *meta, balances[token_address])
+            tokens_with_balance.append(token_info)
+            print(f"✅ {token_info['symbol']}: {token_info['balance_formatted']}")
         
         return tokens_with_balance
     
     def get_all_tokens_alchemy(self, api_key):
         """Get all ERC20 tokens with balances using Alchemy API"""
         
-        # Chain mapping for Alchemy
-        chain_names = {
-            1: "eth-mainnet",
-            10: "opt-mainnet", 
-            8453: "base-mainnet",
-            42161: "arb-mainnet",
-            137: "polygon-mainnet"
-        }
-        
-        chain = chain_names.get(self.chain_id, "eth-mainnet")
-        
-        url = f"https://{chain}.g.alchemy.com/v2/{api_key}"
-        
-        payload = {
-            "id": 1,
-            "jsonrpc": "2.0",
-            "method": "alchemy_getTokenBalances",
-            "params": [self.safe_address]  # Gets ALL tokens automatically
-        }
+        url = _alchemy_url(self.chain_id, api_key)
         
         try:
-            response = requests.post(url, json=payload)
-            data = response.json()
+            # The "erc20" spec returns every ERC20 the Safe holds, paginated with pageKey
+            token_balances = []
+            page_key = None
+            while True:
+                params = [self.safe_address, "erc20"]
+                if page_key:
+                    params.append({"pageKey": page_key})
+                
+                payload = {
+                    "id": 1,
+                    "jsonrpc": "2.0",
+                    "method": "alchemy_getTokenBalances",
+                    "params": params
+                }
+                response = self.http.post(url, json=payload, timeout=_HTTP_TIMEOUT)
+                data = response.json()
+                
+                result = data.get('result') if isinstance(data, dict) else None
+                if not isinstance(result, dict) or not isinstance(result.get('tokenBalances'), list):
+                    break
+                token_balances.extend(result['tokenBalances'])
+                page_key = result.get('pageKey')
+                if not page_key:
+                    break
             
             tokens_with_balance = []
             
-            if 'result' in data and 'tokenBalances' in data['result']:
-                print(f"🔍 Found {len(data['result']['tokenBalances'])} tokens, checking balances...")
+            if token_balances:
+                print(f"🔍 Found {len(token_balances)} tokens, checking balances...")
                 
-                for token_data in data['result']['tokenBalances']:
-                    balance = int(token_data['tokenBalance'], 16)  # Convert hex to int
+                held_tokens = []
+                for token_data in token_balances:
+                    if not isinstance(token_data, dict) or not Web3.is_address(token_data.get('contractAddress')):
+                        continue  # malformed entry
+                    balance_hex = token_data.get('tokenBalance') or '0x0'
+                    if not isinstance(balance_hex, str):
+                        continue
+                    balance = int(balance_hex, 16)  # Convert hex to int
                     if balance > 0:
-                        # Get token info (name, symbol, decimals)
-                        token_info = self.get_token_info(token_data['contractAddress'])
-                        if token_info:
-                            tokens_with_balance.append(token_info)
-                            print(f"✅ {token_info['symbol']}: {token_info['balance_formatted']}")
+                        held_tokens.append((token_data['contractAddress'], balance))
+                
+                # Get token metadata (name, symbol, decimals) for uncached tokens in batched requests
+                uncached = [token_address for token_address, _ in held_tokens if self._cached_metadata(token_address) is None]
+                try:
+                    metadata = self._rpc_batch(url, [
+                        ("alchemy_getTokenMetadata", [token_address]) for token_address in uncached
+                    ])
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    # Keep the balances; these tokens read their metadata from the contract below
+                    print(f"❌ Alchemy metadata lookup failed: {e}")
+                    metadata = []
+                for token_address, token_meta in zip(uncached, metadata):
+                    # Alchemy returns nulls for metadata it could not read; only cache complete entries
+                    if isinstance(token_meta, dict) and all(token_meta.get(field) is not None for field in ('name', 'symbol', 'decimals')):
+                        self._store_metadata(token_address, token_meta['name'], token_meta['symbol'], token_meta['decimals'])
+                self._save_meta_cache()
+                
+                for token_address, balance in held_tokens:
+                    meta = self._cached_metadata(token_address)
+                    if meta is not None:
+                        token_info = self._token_info_dict(token_address, *meta, balance)
+                    else:
+                        # No usable metadata from Alchemy, read it from the token contract
+                        token_info = self.get_token_info(token_address)
+                    if token_info:
+                        tokens_with_balance.append(token_info)
+                        print(f"✅ {token_info['symbol']}: {token_info['balance_formatted']}")
             
             return tokens_with_balance
             
-        except Exception as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Transport errors, non-JSON responses and malformed hex balances
             print(f"❌ Error using Alchemy API: {e}")
             print("💡 Falling back to manual token list...")
             return []
         
     def encode_transfer_data(self, recipient, amount):
-        """Encode ERC20 transfer function data"""
-        function_selector = "0xa9059cbb"
-        recipient_padded = Web3.to_checksum_address(recipient)[2:].lower().zfill(64)
-        amount_hex = hex(amount)[2:].zfill(64)
-        return function_selector + recipient_padded + amount_hex
+        """Encode ERC20 transfer function data (returns raw calldata bytes)"""
+        return _encode_transfer(bytes.fromhex(checksum(recipient)[2:]), amount)
     
-    def encode_multisend_transaction(self, to, value, data, operation=0):
+    def encode_multisend_transaction(self, to_bytes, value, data, operation=0):
         """
         Encode a single transaction for MultiSend
         Format: operation (1 byte) + to (20 bytes) + value (32 bytes) + dataLength (32 bytes) + data
+        to_bytes: 20-byte destination address, data: raw calldata bytes
         """
         operation_bytes = operation.to_bytes(1, 'big')
-        to_bytes = bytes.fromhex(to[2:])  # Remove 0x prefix
         value_bytes = value.to_bytes(32, 'big')
-        data_bytes = bytes.fromhex(data[2:]) if data.startswith('0x') else bytes.fromhex(data)
-        data_length_bytes = len(data_bytes).to_bytes(32, 'big')
+        data_length_bytes = len(data).to_bytes(32, 'big')
         
-        return operation_bytes + to_bytes + value_bytes + data_length_bytes + data_bytes
+        return b''.join([operation_bytes, to_bytes, value_bytes, data_length_bytes, data])
     
     def create_multisend_data(self, transactions):
         """
         Create MultiSend transaction data
-        transactions: list of (to, value, data, operation) tuples
+        transactions: list of (to_bytes, value, data, operation) tuples, to_bytes and data as bytes
         """
-        encoded_txs = b''
+        data_offset = 32  # Offset to the data (after the length)
         
-        for to, value, data, operation in transactions:
-            encoded_tx = self.encode_multisend_transaction(to, value, data, operation)
-            encoded_txs += encoded_tx
+        # ABI encode: selector + offset + length + data, appended into one buffer
+        multisend_data = bytearray(_MULTISEND_SELECTOR)
+        multisend_data += data_offset.to_bytes(32, 'big')  # offset
+        multisend_data += bytes(32)                        # length, filled in below
+        header_length = len(multisend_data)
         
-        # MultiSend function selector: multiSend(bytes)
-        multisend_selector = "0x8d80ff0a"
+        for to_bytes, value, data, operation in transactions:
+            multisend_data += self.encode_multisend_transaction(to_bytes, value, data, operation)
         
-        # Encode the transactions data
-        data_length = len(encoded_txs)
-        data_offset = 32  # Offset to the data (after the length)
+        # Encode the transactions data length
+        data_length = len(multisend_data) - header_length
+        multisend_data[header_length - 32:header_length] = data_length.to_bytes(32, 'big')
         
-        # ABI encode: selector + offset + length + data
-        multisend_data = (
-            multisend_selector +
-            hex(data_offset)[2:].zfill(64) +  # offset
-            hex(data_length)[2:].zfill(64) +  # length
-            encoded_txs.hex()                 # actual transaction data
-        )
-        
-        return multisend_data
+        return "0x" + multisend_data.hex()
     
     def calculate_safe_tx_hash(self, safe_tx):
         """Calculate Safe transaction hash for approval"""
-        # EIP-712 domain separator
-        domain_typehash = keccak(text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
-        name_hash = keccak(text="Safe")
-        version_hash = keccak(text="1.3.0")
-        
-        domain_separator = keccak(
-            self.w3.codec.encode(
-                ['bytes32', 'bytes32', 'bytes32', 'uint256', 'address'],
-                [domain_typehash, name_hash, version_hash, self.chain_id, self.safe_address]
-            )
+        safe_tx_hash = _safe_tx_hash(
+            self._domain_separator,
+            safe_tx['to'],
+            int(safe_tx['value']),
+            _keccak_hex(safe_tx['data']),
+            safe_tx['operation'],
+            int(safe_tx['safeTxGas']),
+            int(safe_tx['baseGas']),
+            int(safe_tx['gasPrice']),
+            safe_tx['gasToken'],
+            safe_tx['refundReceiver'],
+            safe_tx['nonce']
         )
-        
-        # Safe transaction type hash
-        safe_tx_typehash = keccak(text="SafeTx(address to,uint256 value,bytes data,uint8 operation,uint256 safeTxGas,uint256 baseGas,uint256 gasPrice,address gasToken,address refundReceiver,uint256 nonce)")
-        
-        # Encode transaction
-        encoded_tx = self.w3.codec.encode(
-            ['bytes32', 'address', 'uint256', 'bytes32', 'uint8', 'uint256', 'uint256', 'uint256', 'address', 'address', 'uint256'],
-            [
-                safe_tx_typehash,
-                safe_tx['to'],
-                int(safe_tx['value']),
-                keccak(hexstr=safe_tx['data']),
-                safe_tx['operation'],
-                int(safe_tx['safeTxGas']),
-                int(safe_tx['baseGas']),
-                int(safe_tx['gasPrice']),
-                safe_tx['gasToken'],
-                safe_tx['refundReceiver'],
-                safe_tx['nonce']
-            ]
-        )
-        
-        # Calculate final hash
-        safe_tx_hash = keccak(b'\x19\x01' + domain_separator + keccak(encoded_tx))
         return "0x" + safe_tx_hash.hex()
     
     def build_multisend_transaction(self, token_transfers, nonce=0):
@@ -256,13 +652,23 @@ class MultiSendSafeTransaction:
         Build a MultiSend transaction for token transfers
         token_transfers: list of (token_address, recipient, amount) tuples
         """
+        # Checksum and decode each distinct token / recipient address once, not per transfer
+        recipient_bytes = {
+            recipient: bytes.fromhex(checksum(recipient)[2:])
+            for recipient in {recipient for _, recipient, _ in token_transfers}
+        }
+        token_bytes = {
+            token_address: bytes.fromhex(checksum(token_address)[2:])
+            for token_address in {token_address for token_address, _, _ in token_transfers}
+        }
+        
         # Prepare individual transactions for MultiSend
         transactions = []
         
         for token_address, recipient, amount in token_transfers:
-            transfer_data = self.encode_transfer_data(recipient, amount)
+            transfer_data = _encode_transfer(recipient_bytes[recipient], amount)
             transactions.append((
-                Web3.to_checksum_address(token_address),
+                token_bytes[token_address],
                 0,  # value (ETH)
                 transfer_data,
                 0   # operation (CALL)
@@ -290,6 +696,23 @@ class MultiSendSafeTransaction:
         
         return safe_tx, tx_hash
 
+def get_all_tokens_multichain(safe_address, api_key, chain_ids=None):
+    """
+    Scan a Safe on several chains at once using Alchemy
+    Per-chain scans run concurrently so total time is roughly the slowest chain, not the sum
+    Returns a dict of chain_id -> list of token infos
+    """
+    if chain_ids is None:
+        chain_ids = list(ALCHEMY_CHAIN_NAMES)
+    
+    def scan_chain(chain_id):
+        # Built in the worker so each chain's connectivity check overlaps the others
+        builder = MultiSendSafeTransaction(safe_address, chain_id, _alchemy_url(chain_id, api_key))
+        return builder.get_all_tokens_alchemy(api_key)
+    
+    with ThreadPoolExecutor(max_workers=_MAX_CHAIN_WORKERS) as executor:
+        return dict(zip(chain_ids, executor.map(scan_chain, chain_ids)))
+
 def main():
     """Generate MultiSend transaction for ALL tokens in Safe"""
     print("=== Safe MultiSend Transaction Generator (ALL TOKENS) ===\n")
@@ -301,6 +724,9 @@ def main():
     if SAFE_ADDRESS == "0xYOUR_SAFE_ADDRESS" or RECIPIENT_ADDRESS == "0xRECIPIENT_ADDRESS":
         print("❌ Please provide actual Safe and recipient addresses!")
         return
+    if not Web3.is_address(RECIPIENT_ADDRESS):
+        print(f"❌ Invalid recipient address: {RECIPIENT_ADDRESS}")
+        return
     
     # Network selection
     network_input = input("Enter network (1=mainnet, 10=optimism, 8453=base) [default: 1]: ").strip()
@@ -311,9 +737,7 @@ def main():
     
     # RPC endpoint (using Alchemy if API key provided)
     if api_key:
-        chain_names = {1: "eth-mainnet", 10: "opt-mainnet", 8453: "base-mainnet"}
-        chain_name = chain_names.get(chain_id, "eth-mainnet")
-        rpc_url = f"https://{chain_name}.g.alchemy.com/v2/{api_key}"
+        rpc_url = _alchemy_url(chain_id, api_key)
     else:
         rpc_url = input("Enter RPC URL (or press Enter for default): ").strip()
         if not rpc_url:
@@ -329,7 +753,11 @@ def main():
     nonce = int(nonce_input) if nonce_input else 0
     
     # Create MultiSend transaction builder
-    multisend_builder = MultiSendSafeTransaction(SAFE_ADDRESS, chain_id, rpc_url)
+    try:
+        multisend_builder = MultiSendSafeTransaction(SAFE_ADDRESS, chain_id, rpc_url)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
     
     print(f"\n🔍 Discovering ALL tokens in Safe {SAFE_ADDRESS}...")
     
@@ -368,6 +796,9 @@ def main():
             except ValueError:
                 print("❌ Invalid selection, using all tokens")
     
+    # Lookup table of discovered token info by address
+    tokens_by_address = {token['address'].lower(): token for token in all_tokens}
+    
     # Create token transfers
     token_transfers = []
     for token in all_tokens:
@@ -388,12 +819,24 @@ def main():
     print(f"Nonce: {nonce}")
     print(f"MultiSend Contract: {multisend_builder.multisend_address}")
     
-    print(f"\n📋 Transaction Details ({len(token_transfers)} tokens):")
+    # Transfer details for display and output, looked up once per transfer
+    transfer_details = []
     for token_address, recipient, amount in token_transfers:
         # Find token info from our discovered tokens
-        token_info = next((t for t in all_tokens if t['address'].lower() == token_address.lower()), None)
+        token_info = tokens_by_address.get(token_address.lower())
         if token_info:
-            print(f"  {token_info['symbol']}: {amount / (10 ** token_info['decimals']):.6f}")
+            transfer_details.append({
+                "token": token_info['symbol'],
+                "name": token_info['name'],
+                "address": token_address,
+                "amount": amount,
+                "decimals": token_info['decimals'],
+                "amount_formatted": f"{amount / (10 ** token_info['decimals']):.6f}"
+            })
+    
+    print(f"\n📋 Transaction Details ({len(token_transfers)} tokens):")
+    for transfer in transfer_details:
+        print(f"  {transfer['token']}: {transfer['amount_formatted']}")
     
     print(f"\n🔑 Transaction Hash (for approveHash):")
     print(tx_hash)
@@ -410,27 +853,12 @@ def main():
             "nonce": nonce,
             "multisend_address": multisend_builder.multisend_address
         },
-        "transfers": [],
+        "transfers": transfer_details,
         "transaction_hash": tx_hash,
         "safe_transaction": safe_tx
     }
     
-    # Add transfer details to output data
-    for token_address, recipient, amount in token_transfers:
-        # Find token info from our discovered tokens
-        token_info = next((t for t in all_tokens if t['address'].lower() == token_address.lower()), None)
-        if token_info:
-            output_data["transfers"].append({
-                "token": token_info['symbol'],
-                "name": token_info['name'],
-                "address": token_address,
-                "amount": amount,
-                "decimals": token_info['decimals'],
-                "amount_formatted": f"{amount / (10 ** token_info['decimals']):.6f}"
-            })
-    
-    with open('multisend_safe_tx.json', 'w') as f:
-        json.dump(output_data, f, indent=2)
+    Path('multisend_safe_tx.json').write_text(json.dumps(output_data, indent=2), encoding='utf-8')
     
     print(f"\n✅ Transaction data saved to: multisend_safe_tx.json")
     
@@ -0,0 +1,79 @@
+"""
+Shared EIP-712 / ABI encoding helpers for the Safe transaction scripts
+"""
+
+import importlib.util
+import os
+
+# Prefer the pysha3 keccak backend when it is installed (faster than the pycryptodome
+# fallback); must be set before eth_hash picks a backend on its first hash
+if importlib.util.find_spec("sha3") is not None:
+    os.environ.setdefault("ETH_HASH_BACKEND", "pysha3")
+
+from eth_hash.auto import keccak
+from eth_utils import to_checksum_address
+import functools
+import json
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is used instead
+    orjson = None
+
+# EIP-712 type hashes (constant, so hash them once at import)
+DOMAIN_TYPEHASH = keccak(b"EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
+NAME_HASH = keccak(b"Safe")
+VERSION_HASH = keccak(b"1.3.0")
+SAFE_TX_TYPEHASH = keccak(b"SafeTx(address to,uint256 value,bytes data,uint8 operation,uint256 safeTxGas,uint256 baseGas,uint256 gasPrice,address gasToken,address refundReceiver,uint256 nonce)")
+
+# Zero address and zero ABI word, shared by the default gasToken/refundReceiver/gas fields
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+ZERO32 = bytes(32)
+
+@functools.lru_cache(maxsize=4096)
+def checksum(address):
+    """EIP-55 checksum an address, remembering results for repeated addresses"""
+    return to_checksum_address(address)
+
+def uint_word(value):
+    """Encode a uint as a 32-byte ABI word (reusing the shared zero word for 0)"""
+    return ZERO32 if value == 0 else value.to_bytes(32, 'big')
+
+def address_word(address):
+    """Left-pad a 0x-prefixed address to a 32-byte ABI word"""
+    if address == ZERO_ADDRESS:
+        return ZERO32
+    address_bytes = bytes.fromhex(address[2:])
+    if len(address_bytes) != 20:
+        raise ValueError(f"Invalid address: {address}")
+    return bytes(12) + address_bytes
+
+def encode_domain(chain_id, safe_address):
+    """ABI encode the EIP-712 domain struct: five fixed 32-byte words"""
+    return DOMAIN_TYPEHASH + NAME_HASH + VERSION_HASH + chain_id.to_bytes(32, 'big') + address_word(safe_address)
+
+def encode_safe_tx(typehash, to, value, data_hash, operation, safe_tx_gas, base_gas, gas_price, gas_token, refund_receiver, nonce):
+    """ABI encode the SafeTx struct: eleven fixed 32-byte words, so no ABI codec is needed"""
+    return b''.join([
+        typehash,
+        address_word(to),
+        uint_word(value),
+        data_hash,
+        uint_word(operation),
+        uint_word(safe_tx_gas),
+        uint_word(base_gas),
+        uint_word(gas_price),
+        address_word(gas_token),
+        address_word(refund_receiver),
+        uint_word(nonce)
+    ])
+
+def json_dumps(obj):
+    """JSON-encode with a 2-space indent, using orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits, which orjson cannot encode
+    # Like orjson, keep non-ASCII characters as UTF-8 rather than \u escapes
+    return json.dumps(obj, indent=2, ensure_ascii=False)
@@ -1,10 +1,37 @@
-from web3 import Web3
+from safe_common import (
+    SAFE_TX_TYPEHASH, ZERO_ADDRESS, ZERO32,
+    checksum, uint_word, address_word, encode_domain, encode_safe_tx, json_dumps
+)
 from eth_account.messages import encode_defunct
 from eth_utils import keccak
-import json
 
-# ERC20 ABI for transfer function
-ERC20_ABI = json.loads('[{"constant":false,"inputs":[{"name":"_to","type":"address"},{"name":"_value","type":"uint256"}],"name":"transfer","outputs":[{"name":"","type":"bool"}],"type":"function"}]')
+# ERC20 transfer(address,uint256) function selector
+_TRANSFER_SELECTOR = "0xa9059cbb"
+
+# SafeTx words for operation (CALL), safeTxGas, baseGas, gasPrice, gasToken and refundReceiver
+# when all are zero, the shape of every transaction this builder creates
+_ZERO_TAIL = ZERO32 * 6
+
+def _encode_simple_safe_tx(to, value, data_hash, nonce):
+    """ABI encode a SafeTx whose operation, gas and refund fields are all zero"""
+    return b''.join([
+        SAFE_TX_TYPEHASH,
+        address_word(to),
+        uint_word(value),
+        data_hash,
+        _ZERO_TAIL,
+        uint_word(nonce)
+    ])
+
+# SafeTx fields the Safe transaction service JSON expects as decimal strings
+_UINT_STRING_FIELDS = ("value", "safeTxGas", "baseGas", "gasPrice")
+
+def _json_serializable(safe_tx):
+    """Copy of a Safe transaction with uint fields stringified, as Safe's JSON format expects"""
+    serializable = dict(safe_tx)
+    for field in _UINT_STRING_FIELDS:
+        serializable[field] = str(serializable[field])
+    return serializable
 
 class SafeTransactionBuilder:
     def __init__(self, safe_address, chain_id=1):
@@ -15,10 +42,12 @@ class SafeTransactionBuilder:
             safe_address: The Safe multisig contract address
             chain_id: Chain ID (1 for mainnet, 10 for Optimism, 8453 for Base, etc.)
         """
-        self.w3 = Web3()
-        self.safe_address = Web3.to_checksum_address(safe_address)
+        self.safe_address = checksum(safe_address)
         self.chain_id = chain_id
         
+        # EIP-712 domain separator, constant for this Safe and chain
+        self._domain_separator = keccak(encode_domain(self.chain_id, self.safe_address))
+        
     def encode_erc20_transfer(self, token_address, recipient, amount):
         """
         Encode ERC20 transfer function call
@@ -31,16 +60,13 @@ class SafeTransactionBuilder:
         Returns:
             Encoded function call data
         """
-        token_address = Web3.to_checksum_address(token_address)
-        recipient = Web3.to_checksum_address(recipient)
+        token_address = checksum(token_address)
+        recipient = checksum(recipient)
+        if not 0 <= amount < 2**256:
+            raise ValueError(f"Amount out of uint256 range: {amount}")
         
-        # Create contract instance
-        contract = self.w3.eth.contract(address=token_address, abi=ERC20_ABI)
-        
-        # Encode the transfer function
-        data = contract.functions.transfer(recipient, amount).build_transaction()['data']
-        
-        return data
+        # Selector + left-padded recipient + amount as a 32-byte word
+        return _TRANSFER_SELECTOR + recipient[2:].lower().zfill(64) + f"{amount:064x}"
     
     def create_safe_transaction(self, to, value, data, operation=0, nonce=None):
         """
@@ -54,21 +80,38 @@ class SafeTransactionBuilder:
             nonce: Transaction nonce (optional)
             
         Returns:
-            Safe transaction dictionary
+            Safe transaction dictionary (uint fields as ints; see _json_serializable for export)
         """
         return {
-            "to": Web3.to_checksum_address(to),
-            "value": str(value),
+            "to": checksum(to),
+            "value": value,
             "data": data,
             "operation": operation,
-            "safeTxGas": "0",
-            "baseGas": "0",
-            "gasPrice": "0",
-            "gasToken": "0x0000000000000000000000000000000000000000",
-            "refundReceiver": "0x0000000000000000000000000000000000000000",
+            "safeTxGas": 0,
+            "baseGas": 0,
+            "gasPrice": 0,
+            "gasToken": ZERO_ADDRESS,
+            "refundReceiver": ZERO_ADDRESS,
             "nonce": nonce if nonce is not None else 0
         }
     
+    def create_safe_transaction_simple(self, to, data, nonce=0):
+        """
+        Calculate the Safe transaction hash for a plain call (value 0, no gas refund settings)
+        without building the transaction dictionary
+        
+        Args:
+            to: Destination address
+            data: Transaction data
+            nonce: Transaction nonce
+            
+        Returns:
+            Transaction hash (bytes32), same as calculate_safe_tx_hash(create_safe_transaction(to, 0, data, nonce=nonce))
+        """
+        data_hash = keccak(bytes.fromhex(data.removeprefix('0x')))
+        encoded_tx = _encode_simple_safe_tx(checksum(to), 0, data_hash, nonce)
+        return keccak(b'\x19\x01' + self._domain_separator + keccak(encoded_tx))
+    
     def calculate_safe_tx_hash(self, safe_tx):
         """
         Calculate the Safe transaction hash for approval
@@ -79,44 +122,25 @@ class SafeTransactionBuilder:
         Returns:
             Transaction hash (bytes32)
         """
-        # EIP-712 domain separator
-        domain_separator = keccak(
-            self.w3.codec.encode(
-                ['bytes32', 'bytes32', 'uint256', 'address'],
-                [
-                    keccak(text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"),
-                    keccak(text="Safe"),
-                    keccak(text="1.3.0"),
-                    self.chain_id,
-                    self.safe_address
-                ]
-            )
-        )
-        
-        # Safe transaction type hash
-        safe_tx_typehash = keccak(text="SafeTx(address to,uint256 value,bytes data,uint8 operation,uint256 safeTxGas,uint256 baseGas,uint256 gasPrice,address gasToken,address refundReceiver,uint256 nonce)")
-        
-        # Encode transaction data
-        encoded_tx = self.w3.codec.encode(
-            ['bytes32', 'address', 'uint256', 'bytes32', 'uint8', 'uint256', 'uint256', 'uint256', 'address', 'address', 'uint256'],
-            [
-                safe_tx_typehash,
-                safe_tx['to'],
-                int(safe_tx['value']),
-                keccak(hexstr=safe_tx['data']),
-                safe_tx['operation'],
-                int(safe_tx['safeTxGas']),
-                int(safe_tx['baseGas']),
-                int(safe_tx['gasPrice']),
-                safe_tx['gasToken'],
-                safe_tx['refundReceiver'],
-                safe_tx['nonce']
-            ]
+        # Encode transaction data (int() is a no-op for our ints and still accepts
+        # dicts in the string form of Safe's JSON)
+        encoded_tx = encode_safe_tx(
+            SAFE_TX_TYPEHASH,
+            safe_tx['to'],
+            int(safe_tx['value']),
+            keccak(bytes.fromhex(safe_tx['data'].removeprefix('0x'))),
+            safe_tx['operation'],
+            int(safe_tx['safeTxGas']),
+            int(safe_tx['baseGas']),
+            int(safe_tx['gasPrice']),
+            safe_tx['gasToken'],
+            safe_tx['refundReceiver'],
+            safe_tx['nonce']
         )
         
         # Calculate final hash
         safe_tx_hash = keccak(
-            b'\x19\x01' + domain_separator + keccak(encoded_tx)
+            b'\x19\x01' + self._domain_separator + keccak(encoded_tx)
         )
         
         return safe_tx_hash
@@ -186,7 +210,7 @@ def main():
         nonce=0  # Set appropriate nonce
     )
     print(f"   Transaction Hash: 0x{usdc_hash.hex()}")
-    print(f"   Transaction Data: {json.dumps(usdc_tx, indent=2)}\n")
+    print(f"   Transaction Data: {json_dumps(_json_serializable(usdc_tx))}\n")
     
     # Build Zora transfer
     print("2. Zora Transfer:")
@@ -198,7 +222,7 @@ def main():
         nonce=1  # Increment nonce for second transaction
     )
     print(f"   Transaction Hash: 0x{zora_hash.hex()}")
-    print(f"   Transaction Data: {json.dumps(zora_tx, indent=2)}\n")
+    print(f"   Transaction Data: {json_dumps(_json_serializable(zora_tx))}\n")
     
     # Instructions for execution
     print("=== Execution Instructions ===")
@@ -4,9 +4,17 @@ Safe Transaction Helper for Token Transfers
 Specifically configured for USDC and Zora transfers
 """
 
-from web3 import Web3
+from safe_common import (
+    SAFE_TX_TYPEHASH, ZERO_ADDRESS,
+    checksum, uint_word, address_word, encode_domain, encode_safe_tx, json_dumps
+)
 from eth_utils import keccak
+from eth_hash.auto import keccak as _eth_hash_keccak
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import functools
 import json
+import os
 import sys
 
 # Common token addresses by network
@@ -25,6 +33,12 @@ TOKEN_ADDRESSES = {
     }
 }
 
+# Decimals of the tokens in TOKEN_ADDRESSES, for display amounts
+TOKEN_DECIMALS = {
+    "USDC": 6,
+    "ZORA": 18
+}
+
 # Chain IDs
 CHAIN_IDS = {
     "mainnet": 1,
@@ -34,25 +48,50 @@ CHAIN_IDS = {
     "polygon": 137
 }
 
-def encode_transfer_data(recipient, amount):
-    """Encode ERC20 transfer function data"""
+# Absorbing a constant prefix once and copying the hasher per message only pays off with
+# pysha3, whose hash objects copy their state (pycryptodome's copy re-hashes the prefix)
+_COPY_PREFIX_STATE = os.environ.get("ETH_HASH_BACKEND") == "pysha3"
+
+# TOKEN_DECIMALS keyed by checksummed token address (placeholder addresses are skipped)
+_DECIMALS_BY_ADDRESS = {
+    checksum(address): TOKEN_DECIMALS[symbol]
+    for tokens in TOKEN_ADDRESSES.values()
+    for symbol, address in tokens.items()
+    if len(address) == 42
+}
+
+def _token_decimals(token_name, token_address):
+    """Decimals of a known token by symbol or address, or None when unknown"""
+    decimals = TOKEN_DECIMALS.get(token_name.upper())
+    if decimals is None:
+        decimals = _DECIMALS_BY_ADDRESS.get(token_address)
+    return decimals
+
+def _pad_recipient(recipient):
+    """Validate (checksum) a recipient address and left-pad it to a 32-byte word"""
+    return bytes(12) + bytes.fromhex(checksum(recipient)[2:])
+
+def _encode_transfer_padded(recipient_word, amount):
+    """encode_transfer_data for a recipient already padded by _pad_recipient"""
     # Function selector for transfer(address,uint256)
     function_selector = "0xa9059cbb"
     
-    # Pad recipient address to 32 bytes
-    recipient_padded = Web3.to_checksum_address(recipient)[2:].lower().zfill(64)
-    
-    # Convert amount to hex and pad to 32 bytes
-    amount_hex = hex(amount)[2:].zfill(64)
-    
-    return function_selector + recipient_padded + amount_hex
+    # Padded recipient and amount as a 32-byte word, hex-encoded once
+    return function_selector + (recipient_word + amount.to_bytes(32, 'big')).hex()
+
+def encode_transfer_data(recipient, amount):
+    """Encode ERC20 transfer function data"""
+    return _encode_transfer_padded(_pad_recipient(recipient), amount)
 
 def create_safe_tx_data(config):
     """Create Safe transaction data for both transfers"""
     transactions = []
     
+    # Both transfers go to the same recipient, so validate and pad it once
+    recipient_word = _pad_recipient(config['recipient'])
+    
     # USDC Transfer
-    usdc_data = encode_transfer_data(config['recipient'], config['usdc_amount'])
+    usdc_data = _encode_transfer_padded(recipient_word, config['usdc_amount'])
     usdc_tx = {
         "to": config['usdc_address'],
         "value": "0",
@@ -61,13 +100,13 @@ def create_safe_tx_data(config):
         "safeTxGas": "0",
         "baseGas": "0",
         "gasPrice": "0",
-        "gasToken": "0x0000000000000000000000000000000000000000",
-        "refundReceiver": "0x0000000000000000000000000000000000000000",
+        "gasToken": ZERO_ADDRESS,
+        "refundReceiver": ZERO_ADDRESS,
         "nonce": config['starting_nonce']
     }
     
     # Zora Transfer
-    zora_data = encode_transfer_data(config['recipient'], config['zora_amount'])
+    zora_data = _encode_transfer_padded(recipient_word, config['zora_amount'])
     zora_tx = {
         "to": config['zora_address'],
         "value": "0",
@@ -76,8 +115,8 @@ def create_safe_tx_data(config):
         "safeTxGas": "0",
         "baseGas": "0",
         "gasPrice": "0",
-        "gasToken": "0x0000000000000000000000000000000000000000",
-        "refundReceiver": "0x0000000000000000000000000000000000000000",
+        "gasToken": ZERO_ADDRESS,
+        "refundReceiver": ZERO_ADDRESS,
         "nonce": config['starting_nonce'] + 1
     }
     
@@ -86,42 +125,32 @@ def create_safe_tx_data(config):
     
     return transactions
 
-def calculate_tx_hash(safe_address, chain_id, tx_data):
-    """Calculate Safe transaction hash"""
-    w3 = Web3()
-    
-    # EIP-712 domain separator components
-    domain_typehash = keccak(text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)")
-    name_hash = keccak(text="Safe")
-    version_hash = keccak(text="1.3.0")
-    
-    # Calculate domain separator
-    domain_separator = keccak(
-        w3.codec.encode(
-            ['bytes32', 'bytes32', 'bytes32', 'uint256', 'address'],
-            [domain_typehash, name_hash, version_hash, chain_id, safe_address]
-        )
-    )
-    
-    # Safe transaction type hash
-    safe_tx_typehash = keccak(text="SafeTx(address to,uint256 value,bytes data,uint8 operation,uint256 safeTxGas,uint256 baseGas,uint256 gasPrice,address gasToken,address refundReceiver,uint256 nonce)")
+@functools.lru_cache(maxsize=128)
+def calculate_domain_separator(safe_address, chain_id):
+    """Calculate the EIP-712 domain separator for a Safe (constant per Safe and chain, so memoized)"""
+    return keccak(encode_domain(chain_id, safe_address))
+
+def calculate_tx_hash(safe_address, chain_id, tx_data, domain_separator=None):
+    """
+    Calculate Safe transaction hash
+    domain_separator: optional precomputed result of calculate_domain_separator(safe_address, chain_id)
+    """
+    if domain_separator is None:
+        domain_separator = calculate_domain_separator(safe_address, chain_id)
     
     # Encode transaction
-    encoded_tx = w3.codec.encode(
-        ['bytes32', 'address', 'uint256', 'bytes32', 'uint8', 'uint256', 'uint256', 'uint256', 'address', 'address', 'uint256'],
-        [
-            safe_tx_typehash,
-            tx_data['to'],
-            int(tx_data['value']),
-            keccak(hexstr=tx_data['data']),
-            tx_data['operation'],
-            int(tx_data['safeTxGas']),
-            int(tx_data['baseGas']),
-            int(tx_data['gasPrice']),
-            tx_data['gasToken'],
-            tx_data['refundReceiver'],
-            tx_data['nonce']
-        ]
+    encoded_tx = encode_safe_tx(
+        SAFE_TX_TYPEHASH,
+        tx_data['to'],
+        int(tx_data['value']),
+        keccak(bytes.fromhex(tx_data['data'].removeprefix('0x'))),
+        tx_data['operation'],
+        int(tx_data['safeTxGas']),
+        int(tx_data['baseGas']),
+        int(tx_data['gasPrice']),
+        tx_data['gasToken'],
+        tx_data['refundReceiver'],
+        tx_data['nonce']
     )
     
     # Calculate final hash
@@ -129,34 +158,225 @@ def calculate_tx_hash(safe_address, chain_id, tx_data):
     
     return "0x" + safe_tx_hash.hex()
 
-def export_transactions(transactions, safe_address, chain_id, output_file=None):
-    """Export transaction data to file or console"""
+def calculate_tx_hashes(safe_address, chain_id, transactions):
+    """
+    Calculate Safe transaction hashes for many transactions of the same Safe in one pass
+    Each SafeTx field is encoded for all transactions up front; the domain prefix is built once
+    """
+    prefix = b'\x19\x01' + calculate_domain_separator(safe_address, chain_id)
+    
+    # One column of 32-byte words per SafeTx field
+    tos = [address_word(tx['to']) for tx in transactions]
+    values = [uint_word(int(tx['value'])) for tx in transactions]
+    data_hashes = [keccak(bytes.fromhex(tx['data'].removeprefix('0x'))) for tx in transactions]
+    operations = [uint_word(tx['operation']) for tx in transactions]
+    safe_tx_gases = [uint_word(int(tx['safeTxGas'])) for tx in transactions]
+    base_gases = [uint_word(int(tx['baseGas'])) for tx in transactions]
+    gas_prices = [uint_word(int(tx['gasPrice'])) for tx in transactions]
+    gas_tokens = [address_word(tx['gasToken']) for tx in transactions]
+    refund_receivers = [address_word(tx['refundReceiver']) for tx in transactions]
+    nonces = [uint_word(tx['nonce']) for tx in transactions]
+    
+    rows = zip(
+        tos, values, data_hashes, operations, safe_tx_gases,
+        base_gases, gas_prices, gas_tokens, refund_receivers, nonces
+    )
+    
+    if not _COPY_PREFIX_STATE:
+        return ["0x" + keccak(prefix + keccak(SAFE_TX_TYPEHASH + b''.join(words))).hex() for words in rows]
+    
+    # Start every inner hash from the absorbed typehash and every outer hash from the absorbed prefix
+    inner_template = _eth_hash_keccak.new(SAFE_TX_TYPEHASH)
+    outer_template = _eth_hash_keccak.new(prefix)
+    tx_hashes = []
+    for words in rows:
+        inner = inner_template.copy()
+        inner.update(b''.join(words))
+        outer = outer_template.copy()
+        outer.update(inner.digest())
+        tx_hashes.append("0x" + outer.digest().hex())
+    return tx_hashes
+
+def _hash_chunk(chunk):
+    """Worker entry point: calculate_tx_hashes for a (safe_address, chain_id, transactions) chunk"""
+    return calculate_tx_hashes(*chunk)
+
+def calculate_tx_hashes_parallel(safe_address, chain_id, transactions, workers=None):
+    """calculate_tx_hashes split into one chunk per CPU core, each hashed in its own process"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(transactions) <= 1:
+        return calculate_tx_hashes(safe_address, chain_id, transactions)
+    chunk_size = -(-len(transactions) // workers)  # ceiling division
+    chunks = [
+        (safe_address, chain_id, transactions[start:start + chunk_size])
+        for start in range(0, len(transactions), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+        return [tx_hash for chunk_hashes in executor.map(_hash_chunk, chunks) for tx_hash in chunk_hashes]
+
+def export_transactions(transactions, safe_address, chain_id, output_file=None, workers=1):
+    """
+    Export transaction data to file or console
+    workers > 1 hashes across that many processes (opt-in: serial hashing costs tens of
+    microseconds per transaction, while each worker pays an interpreter start and import)
+    """
     output_data = {
         "safe_address": safe_address,
         "chain_id": chain_id,
         "transactions": []
     }
     
-    for token_name, tx_data, amount in transactions:
-        tx_hash = calculate_tx_hash(safe_address, chain_id, tx_data)
-        
+    # Same Safe for every transaction, so hash them all in one pass
+    tx_datas = [transaction[1] for transaction in transactions]
+    if workers > 1:
+        tx_hashes = calculate_tx_hashes_parallel(safe_address, chain_id, tx_datas, workers)
+    else:
+        tx_hashes = calculate_tx_hashes(safe_address, chain_id, tx_datas)
+    
+    for transaction, tx_hash in zip(transactions, tx_hashes):
+        token_name, tx_data, amount = transaction[:3]
+        # Batch transfers carry their decimals; otherwise look the token up
+        decimals = transaction[3] if len(transaction) > 3 else _token_decimals(token_name, tx_data['to'])
         tx_info = {
             "token": token_name,
-            "amount_wei": str(amount),
-            "amount_decimal": f"{amount / (10**6 if token_name == 'USDC' else 10**18):.6f}",
-            "transaction_hash": tx_hash,
-            "transaction_data": tx_data
+            "amount_wei": str(amount)
         }
+        # Without known decimals a decimal amount would be a guess, so leave it out
+        if decimals is not None:
+            tx_info["amount_decimal"] = f"{amount / 10**decimals:.6f}"
+        tx_info["transaction_hash"] = tx_hash
+        tx_info["transaction_data"] = tx_data
         output_data["transactions"].append(tx_info)
     
     if output_file:
-        with open(output_file, 'w') as f:
-            json.dump(output_data, f, indent=2)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(json_dumps(output_data))
         print(f"✅ Transaction data exported to {output_file}")
     
     return output_data
 
+def _uint256(value, field):
+    """Parse a uint256 field from a JSON int or decimal-digit string (floats/bools are rejected)"""
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        value = int(value)
+    elif isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{field} must be an integer or a string of decimal digits, got {value!r}")
+    if not 0 <= value < 2**256:
+        raise ValueError(f"{field} out of uint256 range: {value}")
+    return value
+
+def build_config(safe_address, recipient, network="mainnet", starting_nonce=0,
+                 usdc_amount=42449330000, zora_amount=187969927611870000000000):
+    """Build the create_safe_tx_data config (default amounts: 42,449.33 USDC, 187,969.927611870 ZORA)"""
+    return {
+        "safe_address": checksum(safe_address),
+        "recipient": checksum(recipient),
+        "usdc_address": TOKEN_ADDRESSES.get(network, {}).get("USDC", TOKEN_ADDRESSES["mainnet"]["USDC"]),
+        "zora_address": TOKEN_ADDRESSES.get(network, {}).get("ZORA", TOKEN_ADDRESSES["mainnet"]["ZORA"]),
+        "usdc_amount": usdc_amount,
+        "zora_amount": zora_amount,
+        "starting_nonce": starting_nonce,
+        "chain_id": CHAIN_IDS.get(network, 1)
+    }
+
+def load_batch_transactions(batch_file, network="mainnet"):
+    """
+    Read transfers from a JSON Lines file, one {"recipient", "token", "amount", "nonce"} object per line
+    token is a symbol from TOKEN_ADDRESSES (e.g. "USDC") or a token contract address; an optional
+    "decimals" gives the token's decimals when it is not one of TOKEN_DECIMALS
+    Returns (token_name, tx_data, amount, decimals) tuples for export_transactions
+    """
+    transactions = []
+    with open(batch_file) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                token = entry['token']
+                if not isinstance(token, str):
+                    raise ValueError(f"token must be a symbol or address string, got {token!r}")
+                if token.upper() in TOKEN_ADDRESSES.get(network, {}):
+                    token = token.upper()
+                token_address = TOKEN_ADDRESSES.get(network, {}).get(token, token)
+                amount = _uint256(entry['amount'], "amount")
+                tx_data = {
+                    "to": checksum(token_address),
+                    "value": "0",
+                    "data": encode_transfer_data(entry['recipient'], amount),
+                    "operation": 0,
+                    "safeTxGas": "0",
+                    "baseGas": "0",
+                    "gasPrice": "0",
+                    "gasToken": ZERO_ADDRESS,
+                    "refundReceiver": ZERO_ADDRESS,
+                    "nonce": _uint256(entry['nonce'], "nonce")
+                }
+                if 'decimals' in entry:
+                    decimals = _uint256(entry['decimals'], "decimals")
+                    if decimals > 77:
+                        raise ValueError(f"decimals out of range: {decimals}")
+                else:
+                    decimals = _token_decimals(token, tx_data['to'])
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{batch_file}:{line_number}: invalid transfer ({e})") from e
+            transactions.append((token, tx_data, amount, decimals))
+    return transactions
+
+def run_cli(args):
+    """Non-interactive mode: --config and/or --batch"""
+    try:
+        settings = {}
+        if args.config:
+            with open(args.config) as f:
+                settings = json.load(f)
+            if not isinstance(settings, dict):
+                raise ValueError(f"{args.config}: expected a JSON object")
+        
+        safe_address = args.safe or settings.get("safe_address")
+        if not safe_address:
+            print("❌ A Safe address is required (--safe or safe_address in --config)")
+            return 1
+        network = str(args.network or settings.get("network") or "mainnet").lower()
+        if network not in CHAIN_IDS:
+            raise ValueError(f"Unknown network: {network} (supported: {', '.join(CHAIN_IDS)})")
+        chain_id = CHAIN_IDS[network]
+        
+        if args.batch:
+            transactions = load_batch_transactions(args.batch, network)
+        else:
+            config_keys = ("starting_nonce", "usdc_amount", "zora_amount")
+            config = build_config(
+                safe_address,
+                settings["recipient"],
+                network,
+                **{key: _uint256(settings[key], key) for key in config_keys if key in settings}
+            )
+            transactions = create_safe_tx_data(config)
+        output_data = export_transactions(transactions, checksum(safe_address), chain_id, args.output or settings.get("output"), args.workers)
+    except (KeyError, TypeError, ValueError, OSError) as e:
+        # json.JSONDecodeError is a ValueError
+        print(f"❌ {e}")
+        return 1
+    
+    if not (args.output or settings.get("output")):
+        print(json_dumps(output_data))
+    return 0
+
 def main():
+    parser = argparse.ArgumentParser(description="Build Safe token transfer transactions and their approveHash hashes")
+    parser.add_argument("--config", help="JSON config with safe_address, recipient, network, starting_nonce (and optional usdc_amount, zora_amount, output)")
+    parser.add_argument("--batch", help="JSON Lines file of transfers: {\"recipient\", \"token\", \"amount\", \"nonce\"} per line (optional \"decimals\")")
+    parser.add_argument("--safe", help="Safe address (overrides the config)")
+    parser.add_argument("--network", choices=list(CHAIN_IDS), help="Network (overrides the config, default: mainnet)")
+    parser.add_argument("--output", help="Write the transaction data to this file instead of stdout")
+    parser.add_argument("--workers", type=int, default=1, help="Hash in this many processes (only worth it for very large batches, default: 1)")
+    args = parser.parse_args()
+    
+    # Without arguments, fall back to the interactive prompts
+    if args.config or args.batch:
+        sys.exit(run_cli(args))
+    
     print("=== Safe Transaction Builder for Token Transfers ===\n")
     
     # Get user inputs
@@ -177,16 +397,7 @@ def main():
     starting_nonce = int(starting_nonce) if starting_nonce else 0
     
     # Configuration
-    config = {
-        "safe_address": Web3.to_checksum_address(safe_address),
-        "recipient": Web3.to_checksum_address(recipient),
-        "usdc_address": TOKEN_ADDRESSES.get(network, {}).get("USDC", TOKEN_ADDRESSES["mainnet"]["USDC"]),
-        "zora_address": TOKEN_ADDRESSES.get(network, {}).get("ZORA", TOKEN_ADDRESSES["mainnet"]["ZORA"]),
-        "usdc_amount": 42449330000,  # 42,449.33 USDC
-        "zora_amount": 187969927611870000000000,  # 187,969.927611870 ZORA
-        "starting_nonce": starting_nonce,
-        "chain_id": chain_id
-    }
+    config = build_config(safe_address, recipient, network, starting_nonce)
     
     # Create transactions
     transactions = create_safe_tx_data(config)
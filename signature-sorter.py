@@ -5,16 +5,21 @@ Just sorts signatures in ascending hex order and concatenates them
 
 def sort_and_concatenate_hashes(hashes):
     """Sort hashes in ascending hex order and concatenate"""
-    # Remove 0x prefix for sorting, then sort
-    clean_hashes = [h.replace('0x', '').lower() for h in hashes]
-    sorted_hashes = sorted(clean_hashes)
+    # Decode to bytes and sort (byte order is the same as lowercase hex order)
+    raw_hashes = []
+    for i, h in enumerate(hashes, 1):
+        try:
+            raw_hashes.append(bytes.fromhex(h.removeprefix('0x').removeprefix('0X')))
+        except ValueError:
+            raise ValueError(f"Signature {i} is not valid hex: {h}") from None
+    raw_hashes.sort()
     
     print("Sorted hashes:")
-    for i, h in enumerate(sorted_hashes, 1):
-        print(f"{i}. 0x{h}")
+    for i, h in enumerate(raw_hashes, 1):
+        print(f"{i}. 0x{h.hex()}")
     
     # Concatenate with 0x prefix
-    result = "0x" + "".join(sorted_hashes)
+    result = "0x" + b"".join(raw_hashes).hex()
     return result
 
 def main():
@@ -31,7 +36,11 @@ def main():
         hashes.append(hash_input)
     
     if hashes:
-        result = sort_and_concatenate_hashes(hashes)
+        try:
+            result = sort_and_concatenate_hashes(hashes)
+        except ValueError as e:
+            print(f"\n❌ {e}")
+            return
         print(f"\n🎯 FINAL SIGNATURE STRING:")
         print(result)
     else:
@@ -1,8 +1,15 @@
 from decimal import Decimal, getcontext
+import argparse
+import sys
 
 # Set precision high enough for crypto calculations
 getcontext().prec = 50
 
+# Precomputed 10^decimals for common token decimals (18 for most ERC20s, 6 for USDC/USDT, 8 for WBTC)
+_PRESET_DECIMALS = (0, 6, 8, 9, 18)
+_INT_MULTIPLIERS = {d: 10 ** d for d in _PRESET_DECIMALS}
+_MULTIPLIERS = {d: Decimal(10) ** d for d in _PRESET_DECIMALS}
+
 def transfer_number(result, decimals=6):
     """
     Convert a decimal balance to the smallest unit by multiplying by 10^decimals
@@ -16,18 +23,63 @@ def transfer_number(result, decimals=6):
     """
     # Remove commas from the input
     result = str(result).replace(',', '')
+    # Whole numbers only need integer arithmetic
+    if decimals >= 0 and '.' not in result and 'e' not in result.lower():
+        try:
+            return int(result) * (_INT_MULTIPLIERS.get(decimals) or 10 ** decimals)
+        except ValueError:
+            pass  # not a plain integer, let Decimal parse (or reject) it
     # Use Decimal for precise arithmetic
     decimal_result = Decimal(result)
-    multiplier = Decimal(10) ** decimals
+    multiplier = _MULTIPLIERS.get(decimals) or Decimal(10) ** decimals
     balance = decimal_result * multiplier
     # Convert to integer to remove any fractional parts
     return int(balance)
 
 
+def convert_batch(lines, decimals=6):
+    """
+    Convert one balance per line (blank lines skipped)
+    Returns (input, result) pairs; raises ValueError naming the first invalid line
+    """
+    results = []
+    for line_number, line in enumerate(lines, 1):
+        number = line.strip()
+        if not number:
+            continue
+        try:
+            results.append((number, transfer_number(number, decimals)))
+        except (ArithmeticError, ValueError) as e:
+            raise ValueError(f"line {line_number}: invalid number {number!r}") from e
+    return results
+
+
 def main():
     """
     Main function to get user input and display the converted result
+    With arguments, converts non-interactively: numbers on the command line or --batch FILE
     """
+    parser = argparse.ArgumentParser(description="Convert balances to the smallest unit (balance * 10^decimals)")
+    parser.add_argument("numbers", nargs="*", help="Balances to convert")
+    parser.add_argument("--decimals", type=int, default=6, help="Number of decimal places (default: 6)")
+    parser.add_argument("--batch", help="File with one balance per line ('-' for stdin)")
+    args = parser.parse_args()
+    
+    if args.numbers or args.batch:
+        try:
+            lines = list(args.numbers)
+            if args.batch == "-":
+                lines.extend(sys.stdin)
+            elif args.batch:
+                with open(args.batch) as f:
+                    lines.extend(f)
+            for _, result in convert_batch(lines, args.decimals):
+                print(result)
+        except (ValueError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+    
     try:
         # Get user input
         number = input("Enter the balance to convert: ")